@@ -1,31 +1,118 @@
 
 import argparse
-import json
 import os
+import queue
 import sys
+import threading
 import time
-from datetime import datetime, timezone
+import zlib
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+try:
+    import orjson as _json
+except ImportError:  # stdlib fallback (json.loads also accepts bytes)
+    import json as _json
+
+try:
+    import simdjson
+except ImportError:  # optional: load_jsonl falls back to _json.loads
+    simdjson = None
 
 from google.cloud import bigtable
 from google.cloud.bigtable import column_family
 
-MAX_TS_MICROS = (2**63) - 1
-
+from jsonl_io import iter_lines
 
+MAX_TS_MICROS = (2**63) - 1
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICRO = timedelta(microseconds=1)
+
+# column families (ids are proto strings) and qualifiers (bytes, so set_cell skips the encode per cell)
+_CF_V = "v"  # vitals: hr/temp/spo2
+_CF_D = "d"  # device: battery
+_CF_M = "m"  # metadata: ts/sensor_id
+_Q_HR = b"hr"
+_Q_TEMP = b"temp"
+_Q_SPO2 = b"spo2"
+_Q_BATTERY = b"battery"
+_Q_SENSOR_ID = b"sensor_id"
+_Q_EVENT_TS = b"event_timestamp"
+
+# salt buckets spread writes across tablets; ~10x the node count (2-digit salt, so <= 100)
+SALT_BUCKETS = 10
+
+# bulk-load batcher sizing: fewer, larger MutateRows RPCs (tune --flush-count with --limit)
+FLUSH_COUNT = 10_000
+MAX_ROW_BYTES = 20 * 1024 * 1024
+
+READ_QUEUE_SIZE = 8192  # parsed records buffered between the reader thread and the batcher
+_READ_DONE = object()
+
+MAX_SKIP_EXAMPLES = 10  # per-line skip messages printed before the rest are only counted
+
+
+def _days_from_civil(y: int, m: int, d: int) -> int:
+    # days since 1970-01-01 for a proleptic Gregorian date (Howard Hinnant's algorithm)
+    y -= m <= 2
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _fast_utc_micros(ts: str) -> int | None:
+    # "YYYY-MM-DDTHH:MM:SS[.fff|.ffffff]Z", the shape ingest.py writes; None means "use datetime"
+    n = len(ts)
+    if ts[-1] != "Z" or (n != 20 and not (n in (24, 27) and ts[19] == ".")):
+        return None
+    if ts[4] != "-" or ts[7] != "-" or ts[10] != "T" or ts[13] != ":" or ts[16] != ":":
+        return None
+    digits = ts[0:4] + ts[5:7] + ts[8:10] + ts[11:13] + ts[14:16] + ts[17:19] + ts[20:-1]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+
+    y, mo, d = int(ts[0:4]), int(ts[5:7]), int(ts[8:10])
+    h, mi, s = int(ts[11:13]), int(ts[14:16]), int(ts[17:19])
+    # days past the 28th go through datetime so month lengths / leap years get validated
+    if not (y >= 1 and 1 <= mo <= 12 and 1 <= d <= 28 and h < 24 and mi < 60 and s < 60):
+        return None
+    frac = int(ts[20:-1].ljust(6, "0")) if n > 20 else 0
+
+    secs = _days_from_civil(y, mo, d) * 86400 + h * 3600 + mi * 60 + s
+    return secs * 1_000_000 + frac
+
+
+# sensors report on a shared tick, so the same timestamp string repeats across rows
+@lru_cache(maxsize=65536)
 def iso_to_micros(ts: str) -> int:
     if not ts:
         raise ValueError("empty event_timestamp")
+    micros = _fast_utc_micros(ts)
+    if micros is not None:
+        return micros
+
     if ts.endswith("Z"):
         ts = ts[:-1] + "+00:00"
     dt = datetime.fromisoformat(ts)
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
-    return int(dt.timestamp() * 1_000_000)
+    # integer arithmetic, so this matches the fast path exactly (no float rounding)
+    return (dt - _EPOCH) // _ONE_MICRO
+
+
+def sensor_row_prefix(sensor_id: str, salt_buckets: int = SALT_BUCKETS) -> bytes:
+    # b"<salt>-<sensor_id>#". crc32 rather than hash(): str hashes are randomized per process,
+    # and readers must derive the same salt. A sensor's rows stay contiguous under one salt,
+    # while "last hour across all sensors" style scans have to fan out over every bucket.
+    salt = zlib.crc32(sensor_id.encode("utf-8")) % salt_buckets
+    return b"%02d-%s#" % (salt, sensor_id.encode("utf-8"))
 
 
-def make_row_key(sensor_id: str, event_micros: int) -> bytes:
-    rev = MAX_TS_MICROS - event_micros
-    return f"{sensor_id}#{rev:019d}".encode("utf-8")
+def make_row_key(prefix: bytes, event_micros: int) -> bytes:
+    # prefix comes from sensor_row_prefix, computed once per sensor by load_jsonl
+    return prefix + b"%019d" % (MAX_TS_MICROS - event_micros)
 
 
 def require_emulator():
@@ -42,26 +129,63 @@ def ensure_table(instance, table_id: str):
         return table, False
 
     families = {
-        "v": column_family.MaxVersionsGCRule(1),  # vitals: hr/temp/spo2
-        "d": column_family.MaxVersionsGCRule(1),  # device: battery
-        "m": column_family.MaxVersionsGCRule(1),  # metadata: ts/sensor_id
+        _CF_V: column_family.MaxVersionsGCRule(1),  # vitals: hr/temp/spo2
+        _CF_D: column_family.MaxVersionsGCRule(1),  # device: battery
+        _CF_M: column_family.MaxVersionsGCRule(1),  # metadata: ts/sensor_id
     }
     table.create(column_families=families)
     return table, True
 
 
-def b(x) -> bytes:
-    return str(x).encode("utf-8")
+def _plain(v):
+    # simdjson hands nested values back as lazy Object/Array proxies tied to the parser's current
+    # document; turn them into dict/list so nothing outlives the document (plain values pass through)
+    if simdjson is not None:
+        if isinstance(v, simdjson.Object):
+            return v.as_dict()
+        if isinstance(v, simdjson.Array):
+            return v.as_list()
+    return v
 
 
-def load_jsonl(table, path: str, limit: int | None = None):
-    written = skipped = 0
-    t0 = time.time()
-    batch = table.mutations_batcher(flush_count=1000)
+# vitals take a narrow, highly repetitive set of values; typed so 97 and 97.0 stay distinct
+@lru_cache(maxsize=4096, typed=True)
+def _enc_cached(v) -> bytes:
+    return f"{v}".encode("utf-8")
 
-    with open(path, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, start=1):
-            if limit is not None and written >= limit:
+
+_CACHEABLE_TYPES = (int, float, str, bool)
+
+
+def enc_num(v) -> bytes | None:
+    if v is None:
+        return None
+    if type(v) in _CACHEABLE_TYPES:
+        return _enc_cached(v)
+    # nested value in one of the unvalidated optional fields: never cached (simdjson proxies hash
+    # by identity and would pin their document), stored as its Python text form
+    return f"{_plain(v)}".encode("utf-8")
+
+
+def read_records(path: str, salt_buckets: int, out: queue.Queue, stop: threading.Event):
+    # reader thread: parse + row key per line, hand plain Python values to load_jsonl.
+    # Puts (line_no, error, fields) per non-blank line, then _READ_DONE.
+    # simdjson parses lazily, so only the handful of fields read below get turned into
+    # Python objects. One parser is reused for the whole file to recycle its buffers.
+    parse = simdjson.Parser().parse if simdjson is not None else _json.loads
+    sensor_cache: dict[str, tuple[bytes, bytes]] = {}  # sensor_id -> (row key prefix, encoded id)
+    spo2_key = None  # probed once, from the first parsed record
+
+    # hot-loop names bound as locals (LOAD_FAST instead of global/attribute lookups per line)
+    iso = iso_to_micros
+    mk_key = make_row_key
+    enc = enc_num
+    put = out.put
+    stopped = stop.is_set
+
+    try:
+        for i, line in enumerate(iter_lines(path), start=1):
+            if stopped():
                 break
 
             line = line.strip()
@@ -69,38 +193,134 @@ def load_jsonl(table, path: str, limit: int | None = None):
                 continue
 
             try:
-                rec = json.loads(line)
+                rec = parse(line)
 
+                # normally str; anything else is converted so no lazy simdjson value outlives this line
                 sensor_id = rec["sensor_id"]
+                if type(sensor_id) is not str:
+                    sensor_id = _plain(sensor_id)
                 ts = rec["event_timestamp"]
-                event_micros = iso_to_micros(ts)
-
-                rk = make_row_key(sensor_id, event_micros)
-                row = table.direct_row(rk)
-
-                # vitals
-                if rec.get("heart_rate") is not None:
-                    row.set_cell("v", "hr", b(rec["heart_rate"]))
-                if rec.get("body_temperature") is not None:
-                    row.set_cell("v", "temp", b(rec["body_temperature"]))
-                spo2 = rec.get("spO2", rec.get("spo2"))
-                if spo2 is not None:
-                    row.set_cell("v", "spo2", b(spo2))
-
-                # device
-                if rec.get("battery_level") is not None:
-                    row.set_cell("d", "battery", b(rec["battery_level"]))
-
-                # metadata
-                row.set_cell("m", "sensor_id", b(sensor_id))
-                row.set_cell("m", "event_timestamp", b(ts))
+                if type(ts) is not str:
+                    ts = _plain(ts)
+                event_micros = iso(ts)
+
+                if spo2_key is None:
+                    # ingest.py always writes "spO2"; only a file from another producer uses "spo2"
+                    spo2_key = "spo2" if "spo2" in rec and "spO2" not in rec else "spO2"
+
+                cached = sensor_cache.get(sensor_id)
+                if cached is None:
+                    sid = str(sensor_id)  # non-string ids (e.g. 12345) keep their text form, as in the original key
+                    cached = sensor_cache[sensor_id] = (
+                        sensor_row_prefix(sid, salt_buckets),
+                        sid.encode("utf-8"),
+                    )
+                prefix, sensor_bytes = cached
+                rk = mk_key(prefix, event_micros)
+
+                # cell values are encoded here, off the main thread
+                fields = (
+                    rk,
+                    sensor_bytes,
+                    ts.encode("utf-8"),
+                    enc(rec.get("heart_rate")),
+                    enc(rec.get("body_temperature")),
+                    enc(rec.get(spo2_key)),
+                    enc(rec.get("battery_level")),
+                )
+                put((i, None, fields))
+            except Exception as e:
+                # queued without its traceback: those frames could still reference this document
+                put((i, e.with_traceback(None), None))
+            finally:
+                # a reused simdjson parser refuses to parse while anything from the previous document
+                # is still referenced, so drop every per-record local that could hold a lazy value
+                rec = sensor_id = ts = None
+    except Exception as e:  # e.g. missing input file: re-raised on the main thread
+        out.put(e)
+    finally:
+        out.put(_READ_DONE)
+
+
+def load_jsonl(
+    table,
+    path: str,
+    limit: int | None = None,
+    salt_buckets: int = SALT_BUCKETS,
+    flush_count: int = FLUSH_COUNT,
+):
+    if not 1 <= salt_buckets <= 100:
+        raise ValueError(f"salt_buckets must be in 1..100, got {salt_buckets}")
 
-                batch.mutate(row)
-                written += 1
+    written = skipped = 0
+    t0 = time.time()
+    batch = table.mutations_batcher(flush_count=flush_count, max_row_bytes=MAX_ROW_BYTES)
+
+    # parsing runs on a reader thread so it overlaps with row building and batcher RPCs here
+    records: queue.Queue = queue.Queue(maxsize=READ_QUEUE_SIZE)
+    stop = threading.Event()
+    reader = threading.Thread(target=read_records, args=(path, salt_buckets, records, stop), daemon=True)
+    reader.start()
+    reader_done = False
+
+    # hot-loop names bound as locals, as in read_records
+    next_item = records.get
+    direct_row = table.direct_row
+    mutate = batch.mutate
+
+    try:
+        while True:
+            item = next_item()
+            if item is _READ_DONE:
+                reader_done = True
+                break
+            if isinstance(item, Exception):
+                raise item
+            if limit is not None and written >= limit:
+                break
 
-            except Exception as e:
-                skipped += 1
-                print(f"[skip] line={i} error={e}", file=sys.stderr)
+            i, err, fields = item
+            if err is None:
+                try:
+                    rk, sensor_bytes, ts_bytes, hr, temp, spo2, battery = fields
+                    row = direct_row(rk)
+                    set_cell = row.set_cell
+
+                    # vitals
+                    if hr is not None:
+                        set_cell(_CF_V, _Q_HR, hr)
+                    if temp is not None:
+                        set_cell(_CF_V, _Q_TEMP, temp)
+                    if spo2 is not None:
+                        set_cell(_CF_V, _Q_SPO2, spo2)
+
+                    # device
+                    if battery is not None:
+                        set_cell(_CF_D, _Q_BATTERY, battery)
+
+                    # metadata
+                    set_cell(_CF_M, _Q_SENSOR_ID, sensor_bytes)
+                    set_cell(_CF_M, _Q_EVENT_TS, ts_bytes)
+
+                    mutate(row)
+                    written += 1
+                    continue
+                except Exception as e:
+                    err = e
+
+            skipped += 1
+            if skipped <= MAX_SKIP_EXAMPLES:
+                print(f"[skip] line={i} error={err}", file=sys.stderr)
+    finally:
+        # stopped early (limit or error): unblock the reader and let it wind down
+        if not reader_done:
+            stop.set()
+            while records.get() is not _READ_DONE:
+                pass
+        reader.join()
+
+    if skipped > MAX_SKIP_EXAMPLES:
+        print(f"[skip] ... {skipped - MAX_SKIP_EXAMPLES} more skipped lines not shown", file=sys.stderr)
 
     batch.flush()
     print(f"[done] written={written} skipped={skipped} elapsed={time.time()-t0:.1f}s")
@@ -113,17 +333,23 @@ def main():
     p.add_argument("--table", default=os.getenv("BIGTABLE_TABLE", "icu_vitals_hot"))
     p.add_argument("--input", default=os.getenv("CLEANED_PATH", "data/vitals_clean.jsonl"))
     p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--salt-buckets", type=int, default=int(os.getenv("BIGTABLE_SALT_BUCKETS", SALT_BUCKETS)))
+    p.add_argument("--flush-count", type=int, default=int(os.getenv("BIGTABLE_FLUSH_COUNT", FLUSH_COUNT)))
     args = p.parse_args()
+    if not 1 <= args.salt_buckets <= 100:
+        p.error(f"--salt-buckets must be in 1..100, got {args.salt_buckets}")
 
     require_emulator()
 
-    client = bigtable.Client(project=args.project, admin=True)
-    instance = client.instance(args.instance)
-
-    table, created = ensure_table(instance, args.table)
+    # admin client only for table creation; the bulk load goes through a data-only client
+    admin_client = bigtable.Client(project=args.project, admin=True)
+    _, created = ensure_table(admin_client.instance(args.instance), args.table)
     print(f"[info] table={args.table} created={created}")
 
-    load_jsonl(table, args.input, args.limit)
+    data_client = bigtable.Client(project=args.project)
+    table = data_client.instance(args.instance).table(args.table)
+
+    load_jsonl(table, args.input, args.limit, args.salt_buckets, args.flush_count)
 
 
 if __name__ == "__main__":
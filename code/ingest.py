@@ -1,8 +1,14 @@
 # ingest.py: reads raw sensor events (JSONL)validates and cleans them at ingestion time, and writes only safe and normalized events.
 
-import json
+import math
 from datetime import datetime, timezone
-from dateutil import parser as dtparser
+
+from jsonl_io import iter_lines
+
+try:
+    import orjson as _json
+except ImportError:  # stdlib fallback: slower, and dumps() returns str instead of bytes
+    import json as _json
 
 INPUT_PATH = "data/vitals_raw.txt"
 OUTPUT_PATH = "data/vitals_clean.jsonl"
@@ -13,14 +19,28 @@ MIN_TEMP_C = 25.0
 time_now_utc = datetime.now(timezone.utc)
 required_fields = ["event_timestamp", "sensor_id", "heart_rate", "body_temperature"]
 
-with open(INPUT_PATH, "r", encoding="utf-8") as inp, open(OUTPUT_PATH, "w", encoding="utf-8") as outp:
-    for raw_event in inp:
+
+def dumps_line(obj) -> bytes:
+    out = _json.dumps(obj)
+    if isinstance(out, str):
+        out = out.encode("utf-8")
+    return out + b"\n"
+
+
+def parse_event_time(ts: str) -> datetime:
+    # producer always sends fixed-shape ISO-8601; same "Z" handling as bigtable_load.iso_to_micros
+    return datetime.fromisoformat(ts[:-1] + "+00:00" if ts.endswith("Z") else ts)
+
+
+# raw bytes from mmap: orjson parses them directly, no per-line decode
+with open(OUTPUT_PATH, "wb") as outp:
+    for raw_event in iter_lines(INPUT_PATH):
         raw_event = raw_event.strip()
         if not raw_event:
             continue
 
         try:
-            record = json.loads(raw_event)
+            record = _json.loads(raw_event)
         except Exception:
             continue
 
@@ -28,7 +48,7 @@ with open(INPUT_PATH, "r", encoding="utf-8") as inp, open(OUTPUT_PATH, "w", enco
             continue
 
         try:
-            dt = dtparser.isoparse(record["event_timestamp"])
+            dt = parse_event_time(record["event_timestamp"])
             hr = record["heart_rate"]
             temp = record["body_temperature"]
         except Exception:
@@ -48,7 +68,8 @@ with open(INPUT_PATH, "r", encoding="utf-8") as inp, open(OUTPUT_PATH, "w", enco
         except Exception:
             continue
 
-        if temp < MIN_TEMP_C or temp > MAX_TEMP_C:
+        # NaN (e.g. the string "nan") would slip past both range comparisons
+        if math.isnan(temp) or temp < MIN_TEMP_C or temp > MAX_TEMP_C:
             continue
 
         if dt.tzinfo is None:
@@ -72,6 +93,6 @@ with open(INPUT_PATH, "r", encoding="utf-8") as inp, open(OUTPUT_PATH, "w", enco
             "battery_level": record.get("battery_level"),
         }
 
-        outp.write(json.dumps(normalized) + "\n")
+        outp.write(dumps_line(normalized))
 
 
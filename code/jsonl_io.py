@@ -0,0 +1,26 @@
+# jsonl_io.py: shared line reader for the JSONL scripts (ingest.py, bigtable_load.py).
+
+import mmap
+
+
+def iter_lines(path: str):
+    # yields each line as raw bytes (newline excluded) straight from a read-only mmap:
+    # no text-mode decode and no readline buffer churn; callers hand the bytes to orjson/simdjson.
+    # Slices are copied out rather than yielded as memoryviews, so the map can always be closed
+    # and simdjson (which wants bytes) can parse them.
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file, nothing to map
+            return
+
+        with mm:
+            find = mm.find
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                end = find(b"\n", pos)
+                if end == -1:
+                    end = size
+                yield mm[pos:end]
+                pos = end + 1
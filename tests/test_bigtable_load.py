@@ -0,0 +1,121 @@
+# Regression checks for bigtable_load.load_jsonl, run against an in-memory stand-in for the Bigtable table.
+
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.cloud.bigtable")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "code"))
+
+import bigtable_load  # noqa: E402
+
+
+class FakeRow:
+    def __init__(self, key):
+        self.key = key
+        self.cells = {}
+
+    def set_cell(self, family, column, value, timestamp=None):
+        if isinstance(column, bytes):
+            column = column.decode("utf-8")
+        self.cells[(family, column)] = value
+
+
+class FakeBatcher:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mutate(self, row):
+        self.rows.append(row)
+
+    def flush(self):
+        pass
+
+
+class FakeTable:
+    def __init__(self):
+        self.rows = []
+
+    def direct_row(self, key):
+        return FakeRow(key)
+
+    def mutations_batcher(self, **kwargs):
+        return FakeBatcher(self.rows)
+
+
+@pytest.fixture(params=["simdjson", "json"])
+def parser(request, monkeypatch):
+    # run each check with the lazy simdjson parser and with the orjson/json fallback
+    if request.param == "simdjson":
+        if bigtable_load.simdjson is None:
+            pytest.skip("pysimdjson not installed")
+    else:
+        monkeypatch.setattr(bigtable_load, "simdjson", None)
+    return request.param
+
+
+def record(i, **overrides):
+    rec = {
+        "event_timestamp": f"2026-01-27T13:50:{i:02d}.771629Z",
+        "sensor_id": f"icu-monitor-{i:03d}",
+        "heart_rate": 70.5,
+        "body_temperature": 37.07,
+        "spO2": 97,
+        "battery_level": 41,
+    }
+    rec.update(overrides)
+    return rec
+
+
+def load(tmp_path, records):
+    path = tmp_path / "vitals.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    table = FakeTable()
+    bigtable_load.load_jsonl(table, str(path))
+    return table.rows
+
+
+@pytest.mark.parametrize("field", ["event_timestamp", "sensor_id"])
+def test_nested_key_field_does_not_jam_parser(tmp_path, parser, field):
+    # a nested value in a key field must not keep the reused simdjson parser's document alive
+    records = [record(i) for i in range(10)]
+    records[1][field] = {"x": 1}
+    rows = load(tmp_path, records)
+
+    expected = {r["sensor_id"].encode("utf-8") for i, r in enumerate(records) if i != 1}
+    assert expected <= {row.cells[("m", "sensor_id")] for row in rows}
+
+
+def test_nested_optional_field_is_stored_as_text(tmp_path, parser):
+    rows = load(tmp_path, [record(0, battery_level={"v": 1}, spO2=[96, 97]), record(1)])
+
+    assert len(rows) == 2
+    assert rows[0].cells[("d", "battery")] == b"{'v': 1}"
+    assert rows[0].cells[("v", "spo2")] == b"[96, 97]"
+    assert rows[1].cells[("d", "battery")] == b"41"
+
+
+@pytest.mark.parametrize(
+    "ts",
+    ["2026-01-27T13:50:50.771629Z", "2024-02-29T23:59:59.500Z", "1969-12-31T23:59:59Z", "2026-01-31T00:00:00Z"],
+)
+def test_iso_to_micros_matches_datetime(ts):
+    dt = datetime.fromisoformat(ts[:-1] + "+00:00")
+    expected = (dt - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+    assert bigtable_load.iso_to_micros(ts) == expected
+
+
+def test_iso_to_micros_rejects_year_zero():
+    with pytest.raises(ValueError):
+        bigtable_load.iso_to_micros("0000-01-01T00:00:00Z")
+
+
+def test_non_string_sensor_id_is_stored_as_text(tmp_path, parser):
+    rows = load(tmp_path, [record(0, sensor_id=12345)])
+
+    assert len(rows) == 1
+    assert rows[0].cells[("m", "sensor_id")] == b"12345"
+    assert b"12345#" in rows[0].key